@@ -1,75 +1,408 @@
+import functools
 import os
+import shutil
 import tempfile
-from datetime import timedelta
-from typing import Tuple, Optional
-import hashlib
+import threading
+import time
+import wave
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Tuple
+import blake3
+import ctranslate2
+import ffmpeg
+import numpy as np
 import streamlit as st
-import whisper 
+import zstandard
+from faster_whisper import BatchedInferencePipeline, WhisperModel
+from faster_whisper.vad import VadOptions, get_speech_timestamps
+
+SAMPLE_RATE = 16000  # Whisper selalu kerja di 16 kHz mono
+CHUNK_LENGTH = 30  # panjang jendela input Whisper (detik)
+RESULTS_CACHE_SIZE = 32  # maksimal hasil transkripsi yang disimpan per session
+SRT_PREVIEW_CHARS = 5000  # panjang preview .srt sebelum user minta tampilan lengkap
+LARGE_UPLOAD_BYTES = 64 * 1024 * 1024  # di atas ini upload gak dijadikan bytes & tanpa preview
+UPLOAD_COPY_BUFFER = 4 * 1024 * 1024
+MODEL_CACHE_SIZE = 2  # model besar (medium/large) makan GB-an memori, jadi cuma simpan 2
+_FINGERPRINT_SAMPLE = 1 << 20  # 1 MiB dari awal + 1 MiB dari akhir file
+
+
+class LRUCache:
+    # dict kecil dengan batas kapasitas, entry paling lama gak dipakai dibuang duluan
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self._data = OrderedDict()
+
+    def __contains__(self, key) -> bool:
+        return key in self._data
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key, default=None):
+        if key not in self._data:
+            return default
+        self._data.move_to_end(key)
+        return self._data[key]
+
+    def put(self, key, value) -> None:
+        self._data[key] = value
+        self._data.move_to_end(key)
+        while len(self._data) > self.capacity:
+            self._data.popitem(last=False)
+
+
+def _compress(data: bytes) -> bytes:
+    # transkrip/SRT gampang dikompres (~70%), zstd dekompresnya sangat cepat
+    return zstandard.ZstdCompressor(level=3, threads=-1).compress(data)
+
+
+def _decompress(blob: bytes) -> bytes:
+    return zstandard.ZstdDecompressor().decompress(blob)
+
+
+def _ffmpeg_exe() -> str:
+    # pakai ffmpeg di PATH, kalau gak ada pakai binary bawaan imageio-ffmpeg
+    exe = shutil.which("ffmpeg")
+    if exe:
+        return exe
+    import imageio_ffmpeg
+    return imageio_ffmpeg.get_ffmpeg_exe()
 
-try:
-    from moviepy.video.io.VideoFileClip import VideoFileClip 
-except Exception:
-    from moviepy.editor import VideoFileClip  
 
 def format_timestamp(seconds: float) -> str:
-    if seconds < 0:
-        seconds = 0
-    td = timedelta(seconds=seconds)
-    total_seconds = int(td.total_seconds())
-    hours = total_seconds // 3600
-    minutes = (total_seconds % 3600) // 60
-    secs = total_seconds % 60
-    milliseconds = int((td.total_seconds() - total_seconds) * 1000)
-    return f"{hours:02d}:{minutes:02d}:{secs:02d},{milliseconds:03d}"
+    # full integer (milidetik) pakai divmod, tanpa timedelta
+    ms = max(0, int(seconds * 1000))
+    hours, ms = divmod(ms, 3_600_000)
+    minutes, ms = divmod(ms, 60_000)
+    secs, ms = divmod(ms, 1000)
+    return f"{hours:02d}:{minutes:02d}:{secs:02d},{ms:03d}"
 
 
 def build_srt_from_segments(segments) -> str:
-    lines = []
-    for i, seg in enumerate(segments, start=1):
-        start_ts = format_timestamp(seg.get("start", 0.0))
-        end_ts = format_timestamp(seg.get("end", 0.0))      
-        text = (seg.get("text") or "").strip()              
-        lines.append(str(i))                                
-        lines.append(f"{start_ts} --> {end_ts}")            
-        lines.append(text)                                  
-        lines.append("")                                    
-    return "\n".join(lines).strip() + "\n"
-
-
-def extract_audio_if_needed(upload_path: str, suffix: str, progress=None) -> Tuple[str, Optional[tempfile.NamedTemporaryFile]]:
-    # cek ekstensi file -> kalau mp3/wav langsung dipakai, kalau mp4 ambil audionya
-    ext = os.path.splitext(upload_path)[1].lower()
-    if ext in [".mp3", ".wav"]:
-        return upload_path, None
-
-    if ext == ".mp4":
-        if progress:
-            progress.progress(20, text="Ngambil audio dari video...")
-        temp_audio = tempfile.NamedTemporaryFile(delete=False, suffix=".wav")  
-        temp_audio.close()
-        with VideoFileClip(upload_path) as clip:
-            clip.audio.write_audiofile(temp_audio.name, fps=16000) 
-        if progress:
-            progress.progress(35, text="Audio berhasil diambil.")
-        return temp_audio.name, temp_audio
-
-    return upload_path, None
+    # satu pass: tiap segmen langsung jadi satu blok SRT.
+    # segmen dict (hasil kita sendiri) selalu punya start/end/text, jadi langsung index
+    return "".join(
+        f"{i}\n{format_timestamp(seg['start'])} --> {format_timestamp(seg['end'])}\n"
+        f"{seg['text'].strip()}\n\n"
+        for i, seg in enumerate(segments, start=1)
+    )
+
+
+def _maybe_load_pcm(path: str) -> Optional[np.ndarray]:
+    # WAV yang sudah 16 kHz mono 16-bit PCM bisa langsung dibaca tanpa ffmpeg
+    if os.path.splitext(path)[1].lower() != ".wav":
+        return None
+    try:
+        with wave.open(path, "rb") as wav:
+            if (wav.getframerate(), wav.getnchannels(), wav.getsampwidth()) != (SAMPLE_RATE, 1, 2):
+                return None
+            frames = wav.readframes(wav.getnframes())
+    except (wave.Error, EOFError):
+        return None
+    return np.frombuffer(frames, np.int16).astype(np.float32) / 32768.0
+
+
+def decode_audio(upload_path: str) -> np.ndarray:
+    # decode audio/video langsung ke memori (float32, 16 kHz mono) tanpa file WAV sementara
+    audio = _maybe_load_pcm(upload_path)
+    if audio is not None:
+        return audio
+    out, _ = (
+        ffmpeg.input(upload_path, threads=0)
+        .output("pipe:", format="s16le", acodec="pcm_s16le", ac=1, ar=SAMPLE_RATE)
+        .run(cmd=_ffmpeg_exe(), capture_stdout=True, capture_stderr=True)
+    )
+    return np.frombuffer(out, np.int16).astype(np.float32) / 32768.0
+
+
+def vad_cut_merge(audio: np.ndarray) -> list:
+    # Cut & Merge ala WhisperX: Silero VAD cari bagian bersuara (yang > 30 detik dipotong),
+    # lalu bagian yang berdekatan digabung selama totalnya masih <= 30 detik (jendela Whisper).
+    # hasilnya gak tergantung model jadi cukup dihitung sekali per file
+    max_samples = CHUNK_LENGTH * SAMPLE_RATE
+    vad_options = VadOptions(max_speech_duration_s=CHUNK_LENGTH, min_silence_duration_ms=160)
+    chunks = []
+    for speech in get_speech_timestamps(audio, vad_options):
+        if chunks and speech["end"] - chunks[-1]["start"] <= max_samples:
+            chunks[-1]["end"] = speech["end"]
+        else:
+            chunks.append({"start": speech["start"], "end": speech["end"]})
+    return [
+        {"start": chunk["start"] / SAMPLE_RATE, "end": chunk["end"] / SAMPLE_RATE}
+        for chunk in chunks
+    ]
 
 
 @st.cache_resource(show_spinner=False)
-def load_whisper_model(model_size: str = "base"):
-    # load model Whisper sekali aja (biar gak berat tiap run)
-    return whisper.load_model(model_size)
+def detect_device() -> Tuple[str, str]:
+    # pilih device secara eksplisit (deteksi otomatis bisa meleset di container)
+    # GPU: bobot int8 + aktivasi FP16 (tensor core), CPU: full int8
+    if ctranslate2.get_cuda_device_count() > 0:
+        return "cuda", "int8_float16"
+    return "cpu", "int8"
 
 
-def _md5_of_file(path: str) -> str:
-    # bikin hash MD5 dari file (buat key unik caching hasil transkripsi)
-    h = hashlib.md5()
+@st.cache_resource(show_spinner=False)
+def _model_cache() -> Tuple[LRUCache, threading.Lock, dict]:
+    # cache_resource cuma nyimpen LRU-nya; isinya diatur sendiri biar model lama bisa dibuang.
+    # memori model (RAM/VRAM) dilepas CTranslate2 begitu referensi terakhirnya hilang,
+    # jadi model yang masih dipakai job tetap hidup sampai job-nya selesai.
+    # lock global cuma buat akses LRU; load model pakai lock per key (dict terakhir)
+    return LRUCache(MODEL_CACHE_SIZE), threading.Lock(), {}
+
+
+def _supports_flash_attention(device: str) -> bool:
+    # encoder CTranslate2 sudah berupa kernel C++/CUDA hasil kompilasi (torch.compile gak berlaku),
+    # tapi di GPU Ampere ke atas attention-nya bisa pakai kernel fused FlashAttention.
+    # bfloat16 cuma didukung CTranslate2 di GPU Ampere+, jadi dipakai sebagai penanda
+    return device == "cuda" and "bfloat16" in ctranslate2.get_supported_compute_types("cuda")
+
+
+def _create_model(model_size: str, device: str, compute_type: str, num_workers: int) -> WhisperModel:
+    model_kwargs = dict(
+        device=device,
+        compute_type=compute_type,
+        cpu_threads=max(1, (os.cpu_count() or 1) // num_workers),
+        num_workers=num_workers,
+    )
+    if _supports_flash_attention(device):
+        try:
+            return WhisperModel(model_size, flash_attention=True, **model_kwargs)
+        except (TypeError, ValueError, RuntimeError):
+            # CTranslate2 lama / kombinasi compute_type yang gak didukung -> attention biasa
+            pass
+    return WhisperModel(model_size, **model_kwargs)
+
+
+def load_whisper_model(model_size: str = "base", num_workers: int = 1):
+    # load model Whisper sekali aja (biar gak berat tiap run)
+    # pakai faster-whisper (CTranslate2) + kuantisasi int8, jauh lebih cepat dari PyTorch FP32
+    # num_workers > 1: core CPU dibagi rata supaya beberapa transcribe bisa jalan bareng
+    device, compute_type = detect_device()
+    key = (model_size, device, compute_type, num_workers)
+    cache, lock, loading_locks = _model_cache()
+    with lock:
+        model = cache.get(key)
+        if model is not None:
+            return model
+        key_lock = loading_locks.setdefault(key, threading.Lock())
+    # load (bisa download GB-an) di luar lock global, jadi session lain gak ikut nunggu;
+    # lock per key: warm-up dan job yang minta model sama gak load dua kali
+    with key_lock:
+        with lock:
+            model = cache.get(key)
+        if model is None:
+            model = _create_model(model_size, device, compute_type, num_workers)
+            with lock:
+                cache.put(key, model)
+    return model
+
+
+def prepare_audio(upload_path: str, content_hash: str, audio_cache: dict) -> Tuple[np.ndarray, list]:
+    # audio hasil decode + potongan VAD disimpan per isi file (hash penuh, bukan fingerprint sampel),
+    # jadi ganti model/batch size gak perlu decode & VAD ulang
+    prepared = audio_cache.get(content_hash)
+    if prepared is None:
+        audio = decode_audio(upload_path)
+        speech_chunks = vad_cut_merge(audio)
+        # cukup simpan audio file terakhir biar RAM gak numpuk
+        audio_cache.clear()
+        prepared = audio_cache[content_hash] = (audio, speech_chunks)
+    return prepared
+
+
+def _split_chunks(speech_chunks: list, parts: int) -> list:
+    # bagi chunk VAD jadi beberapa grup berurutan, jadi potongannya selalu di bagian hening
+    parts = max(1, min(parts, len(speech_chunks)))
+    size, extra = divmod(len(speech_chunks), parts)
+    groups, start = [], 0
+    for i in range(parts):
+        end = start + size + (1 if i < extra else 0)
+        groups.append(speech_chunks[start:end])
+        start = end
+    return groups
+
+
+def _transcribe_group(model, audio: np.ndarray, speech_chunks: list, batch_size: int, language: str, live: Optional[dict] = None) -> list:
+    # chunk hasil VAD didecode per batch
+    batched_model = BatchedInferencePipeline(model=model)
+    segments_iter, _ = batched_model.transcribe(
+        audio,
+        language=language,
+        beam_size=5,
+        batch_size=batch_size,
+        vad_filter=False,
+        clip_timestamps=speech_chunks,
+    )
+    # generator -> list of dict (format yang dipakai build_srt_from_segments);
+    # tiap segmen langsung masuk ke `live` biar UI bisa nampilin hasil sementara
+    segments = []
+    for seg in segments_iter:
+        # dicek tiap segmen, jadi tombol Batalkan beneran menghentikan job yang lagi jalan
+        _check_cancelled(live)
+        item = {"start": seg.start, "end": seg.end, "text": seg.text}
+        segments.append(item)
+        if live is not None:
+            live["segments"].append(item)
+    return segments
+
+
+def transcribe_audio(model, audio: np.ndarray, speech_chunks: list, batch_size: int, num_workers: int = 1, live: Optional[dict] = None) -> list:
+    if not speech_chunks:
+        return []
+    if live is not None:
+        live["speech_duration"] = sum(chunk["end"] - chunk["start"] for chunk in speech_chunks)
+    # bahasa dideteksi sekali dari audio penuh, jadi semua grup pakai bahasa yang sama
+    # dan hasilnya gak tergantung jumlah worker
+    language, _, _ = model.detect_language(audio, vad_filter=True)
+    groups = _split_chunks(speech_chunks, num_workers)
+    if len(groups) == 1:
+        return _transcribe_group(model, audio, groups[0], batch_size, language, live)
+    # tiap grup ditranskripsi paralel (ala whisper.cpp -p N); clip_timestamps
+    # tetap relatif ke audio penuh, jadi timestamp segmen sudah absolut
+    with ThreadPoolExecutor(max_workers=len(groups)) as pool:
+        parts = pool.map(lambda group: _transcribe_group(model, audio, group, batch_size, language, live), groups)
+        return [seg for part in parts for seg in part]
+
+
+def _content_hash(path: str) -> str:
+    # BLAKE3 atas seluruh isi file; cuma dihitung di background job saat cache session miss
+    h = blake3.blake3()
     with open(path, 'rb') as f:
-        for chunk in iter(lambda: f.read(8192), b''):  
+        for chunk in iter(lambda: f.read(UPLOAD_COPY_BUFFER), b''):
             h.update(chunk)
     return h.hexdigest()
 
+
+@st.cache_data(persist="disk", show_spinner=False, max_entries=64)
+def transcribe_cached(content_hash: str, model_size: str, batch_size: int, _num_workers: int, _prepare, _live: Optional[dict] = None) -> Tuple[str, str]:
+    # hasil transkripsi disimpan di disk, jadi reload tab / restart / user lain gak transkripsi ulang.
+    # cache ini dipakai bareng antar user, jadi key-nya hash seluruh isi file (bukan fingerprint sampel)
+    # + setting; _num_workers (gak ngubah hasil), _prepare (decode audio) dan _live (progress)
+    # gak ikut di-hash, dan _prepare baru dipanggil kalau cache miss
+    audio, speech_chunks = _prepare()
+    _check_cancelled(_live)
+    model = load_whisper_model(model_size, _num_workers)
+    segments = transcribe_audio(model, audio, speech_chunks, batch_size, _num_workers, _live)
+    transcript_text = "".join(seg["text"] for seg in segments).strip()
+    return transcript_text, build_srt_from_segments(segments)
+
+
+class TranscriptionCancelled(Exception):
+    pass
+
+
+def _check_cancelled(live: Optional[dict]) -> None:
+    if live is not None and live["cancel"].is_set():
+        raise TranscriptionCancelled()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    # transkripsi jalan di thread terpisah biar UI Streamlit tetap responsif
+    # (CTranslate2 lepas GIL selama inference); satu worker per session,
+    # jadi job user lain gak ngantri di belakang job ini
+    executor = st.session_state.get('executor')
+    if executor is None:
+        executor = st.session_state['executor'] = ThreadPoolExecutor(max_workers=1)
+    return executor
+
+
+def _transcribe_job(upload_path: str, model_size: str, batch_size: int, num_workers: int, audio_cache: dict, live: dict) -> Tuple[str, str]:
+    # dijalankan di background thread; file sementara milik job dihapus setelah selesai/dibatalkan
+    try:
+        _check_cancelled(live)
+        content_hash = _content_hash(upload_path)
+        prepare = functools.partial(prepare_audio, upload_path, content_hash, audio_cache)
+        return transcribe_cached(content_hash, model_size, batch_size, num_workers, prepare, live)
+    finally:
+        _unlink_quietly(upload_path)
+
+
+@st.cache_resource(show_spinner=False)
+def _warmups_in_flight() -> Tuple[set, threading.Lock]:
+    # model yang lagi dipanaskan (global), biar gak ada dua thread yang load model yang sama
+    return set(), threading.Lock()
+
+
+def _warm_up_model(model_size: str, num_workers: int) -> None:
+    # load model + transkripsi 1 detik hening, biar upload pertama langsung ketemu model & kernel yang sudah siap
+    in_flight, lock = _warmups_in_flight()
+    try:
+        model = load_whisper_model(model_size, num_workers)
+        segments, _ = model.transcribe(np.zeros(SAMPLE_RATE, np.float32))
+        list(segments)
+    except Exception:
+        pass
+    finally:
+        with lock:
+            in_flight.discard((model_size, num_workers))
+
+
+def _start_warm_up(model_size: str, num_workers: int) -> None:
+    in_flight, lock = _warmups_in_flight()
+    with lock:
+        if (model_size, num_workers) in in_flight:
+            return
+        in_flight.add((model_size, num_workers))
+    threading.Thread(target=_warm_up_model, args=(model_size, num_workers), daemon=True).start()
+
+
+def _fingerprint_parts(size: int, head, tail) -> str:
+    # bikin sidik jari file (buat key unik caching hasil transkripsi)
+    # bukan hash kriptografis: cuma ukuran + sampel awal/akhir, jadi O(1) berapapun ukuran filenya
+    h = blake3.blake3()
+    h.update(size.to_bytes(8, "little"))
+    h.update(head)
+    h.update(tail)
+    return h.hexdigest()
+
+
+def _fast_fingerprint(data: bytes) -> str:
+    size = len(data)
+    view = memoryview(data)
+    if size <= 2 * _FINGERPRINT_SAMPLE:
+        # file kecil: seluruh isinya di-hash
+        return _fingerprint_parts(size, view, b"")
+    return _fingerprint_parts(size, view[:_FINGERPRINT_SAMPLE], view[-_FINGERPRINT_SAMPLE:])
+
+
+def _fast_fingerprint_stream(f, size: int) -> str:
+    # versi file-like: cuma baca sampel awal/akhir, gak perlu ambil seluruh isinya
+    f.seek(0)
+    if size <= 2 * _FINGERPRINT_SAMPLE:
+        return _fingerprint_parts(size, f.read(), b"")
+    head = f.read(_FINGERPRINT_SAMPLE)
+    f.seek(-_FINGERPRINT_SAMPLE, os.SEEK_END)
+    tail = f.read(_FINGERPRINT_SAMPLE)
+    return _fingerprint_parts(size, head, tail)
+
+
+def _write_upload(uploaded_file) -> str:
+    # simpan jadi file sementara karena ffmpeg butuh path; di-stream pakai buffer 4 MiB
+    # (gak dijadikan satu objek bytes). file ini milik job dan dihapus saat job selesai/dibatalkan
+    uploaded_file.seek(0)
+    suffix = os.path.splitext(uploaded_file.name)[1]
+    with tempfile.NamedTemporaryFile(delete=False, suffix=suffix, buffering=1 << 20) as tmp:
+        shutil.copyfileobj(uploaded_file, tmp, length=UPLOAD_COPY_BUFFER)
+    return tmp.name
+
+
+def _unlink_quietly(path: str) -> None:
+    try:
+        os.unlink(path)
+    except OSError:
+        pass
+
+
+def _cancel_job(job) -> None:
+    # job yang lagi jalan berhenti di segmen berikutnya (dan hapus file sementaranya sendiri);
+    # job yang masih ngantri gak pernah jalan, jadi file sementaranya dihapus di sini
+    future, _, live, upload_path = job
+    live["cancel"].set()
+    if future.cancel():
+        _unlink_quietly(upload_path)
+
 def main():
     st.set_page_config(page_title="Subtitle Generator", layout="wide")
 
@@ -99,15 +432,57 @@ def main():
                 accept_multiple_files=False
             )
 
+    device, compute_type = detect_device()
+    st.sidebar.caption(f"Device: {device} ({compute_type})")
+
+    # batch size buat BatchedInferencePipeline (GPU kuat nampung batch lebih besar)
+    batch_size = st.sidebar.slider(
+        "Batch size transkripsi",
+        min_value=1,
+        max_value=32,
+        value=16 if device == "cuda" else 8,
+        help="Jumlah potongan audio yang diproses sekaligus. Lebih besar = lebih cepat, tapi butuh memori lebih.",
+    )
+
+    # tanpa GPU: audio panjang dibagi ke beberapa worker yang jalan paralel
+    num_workers = 1
+    if device == "cpu":
+        cpu_count = os.cpu_count() or 1
+        num_workers = st.sidebar.slider(
+            "Worker paralel (CPU)",
+            min_value=1,
+            max_value=max(1, cpu_count),
+            value=max(1, min(4, cpu_count // 2)),
+            help="Audio dipotong di bagian hening lalu tiap bagian ditranskripsi bersamaan.",
+        )
+
+    # panaskan model yang dipilih di background, cuma saat ukuran model ganti (sekali per session);
+    # geser-geser slider worker gak memicu load model baru
+    warmed = st.session_state.setdefault('warmed', set())
+    if model_size not in warmed:
+        warmed.add(model_size)
+        _start_warm_up(model_size, num_workers)
+
     placeholder_progress = st.empty()
     progress_bar = None
 
     # kalau ada file diupload
     if uploaded_file is not None:
-        # simpan file upload jadi file sementara
-        with tempfile.NamedTemporaryFile(delete=False, suffix=os.path.splitext(uploaded_file.name)[1]) as tmp:
-            tmp.write(uploaded_file.read())
-            temp_upload_path = tmp.name
+        if uploaded_file.size > LARGE_UPLOAD_BYTES:
+            # file besar: gak dijadikan bytes; fingerprint cuma dari sampel awal/akhir,
+            # preview dimatikan (Streamlit bakal baca & hash seluruh file tiap rerun)
+            media = None
+            fingerprint = _fast_fingerprint_stream(uploaded_file, uploaded_file.size)
+        else:
+            # file kecil: isi upload sudah ada di RAM -> dipakai ulang buat preview & fingerprint
+            media = uploaded_file.getvalue()
+            fingerprint = _fast_fingerprint(media)
+
+        # bikin key unik buat caching (gabungan fingerprint file + model size + batch size)
+        file_key = f"{fingerprint}::{model_size}::{batch_size}"
+        # rerun polling job yang lagi jalan (tiap 0.5 detik) gak perlu kirim ulang media preview
+        running_job = st.session_state.get('jobs', {}).get(file_key)
+        polling = running_job is not None and not running_job[0].done()
 
         st.info(f"File diupload: {uploaded_file.name}")
     
@@ -122,88 +497,165 @@ def main():
             st.markdown("### Preview")
             ext_uploaded = os.path.splitext(uploaded_file.name)[1].lower()
             try:
-                with open(temp_upload_path, "rb") as f:
-                    media_bytes = f.read()
-                if ext_uploaded == ".mp4":
-                    st.video(media_bytes) 
+                if media is None:
+                    st.info("Preview tidak ditampilkan untuk file besar.")
+                elif polling:
+                    st.info("Preview disembunyikan selama transkripsi berjalan.")
+                elif ext_uploaded == ".mp4":
+                    st.video(media)
                 elif ext_uploaded in [".mp3", ".wav"]:
-                    st.audio(media_bytes)  
+                    st.audio(media)
             except Exception:
                 st.info("Preview tidak tersedia.")
-            st.caption(f"Ukuran file: {os.path.getsize(temp_upload_path)/1_000_000:.2f} MB")
+            st.caption(f"Ukuran file: {uploaded_file.size/1_000_000:.2f} MB")
 
         with col_results:
             progress_bar = progress_placeholder.empty()
 
-        # bikin key unik buat caching (gabungan md5 file + model size)
-        file_key = f"{_md5_of_file(temp_upload_path)}::{model_size}"
         if 'results_cache' not in st.session_state:
-            st.session_state['results_cache'] = {}
+            st.session_state['results_cache'] = LRUCache(RESULTS_CACHE_SIZE)
 
         cached = st.session_state['results_cache'].get(file_key)
 
         if cached is None:
-            # kalau belum pernah diproses -> jalankan transkripsi
-            progress_bar = progress_placeholder.progress(5, text="Menyiapkan transkripsi...")
-            audio_path, temp_audio_file = extract_audio_if_needed(temp_upload_path, suffix=".wav", progress=progress_bar)
-
-            progress_bar.progress(45, text=f"Memuat model Whisper ({model_size})...")
-            try:
-                model = load_whisper_model(model_size)
-            except Exception as e:
-                st.error(f"Gagal load model Whisper: {e}")
+            # kalau belum pernah diproses -> jalankan transkripsi di background
+            jobs = st.session_state.setdefault('jobs', {})
+            cancelled = st.session_state.setdefault('cancelled', set())
+
+            if file_key in cancelled:
+                progress_placeholder.info("Transkripsi dibatalkan.")
+                if results_container.button("Transkripsi ulang"):
+                    cancelled.discard(file_key)
+                    st.rerun()
                 return
 
-            progress_bar.progress(65, text="Melakukan transkripsi audio... Ini bisa memakan waktu.")
+            job = jobs.get(file_key)
+            if job is None:
+                # setting/upload ganti di tengah jalan -> job lama dibatalkan dulu,
+                # biar gak makan worker session & file sementaranya gak numpuk
+                for old_key in list(jobs):
+                    _cancel_job(jobs.pop(old_key))
+                upload_path = _write_upload(uploaded_file)
+                audio_cache = st.session_state.setdefault('audio_cache', {})
+                # diisi background thread: segmen yang sudah jadi + total durasi suara
+                # (plus flag cancel yang dicek job di sela-sela segmen)
+                live = {"segments": [], "speech_duration": 0.0, "cancel": threading.Event()}
+                future = _get_executor().submit(
+                    _transcribe_job, upload_path, model_size, batch_size, num_workers,
+                    audio_cache, live,
+                )
+                job = jobs[file_key] = (future, time.monotonic(), live, upload_path)
+
+            future, started_at, live, _ = job
+            if not future.done():
+                elapsed = time.monotonic() - started_at
+                # worker paralel bisa selesai gak urut, jadi diurutkan dulu sebelum ditampilkan
+                partial = sorted(live["segments"], key=lambda seg: seg["start"])
+                done_seconds = sum(seg["end"] - seg["start"] for seg in partial)
+                percent = 35
+                if live["speech_duration"] > 0:
+                    percent += int(60 * min(1.0, done_seconds / live["speech_duration"]))
+                progress_placeholder.progress(
+                    percent, text=f"Melakukan transkripsi audio ({model_size})... {elapsed:.0f} detik"
+                )
+                if partial:
+                    results_container.text_area(
+                        "Subtitle sementara",
+                        value=build_srt_from_segments(partial),
+                        height=260,
+                        disabled=True,
+                    )
+                if results_container.button("Batalkan"):
+                    _cancel_job(job)
+                    jobs.pop(file_key, None)
+                    cancelled.add(file_key)
+                    st.rerun()
+                # cek lagi sebentar lagi tanpa nge-blok UI
+                time.sleep(0.5)
+                st.rerun()
+
+            jobs.pop(file_key, None)
             try:
-                result = model.transcribe(audio_path)
+                transcript_text, srt_content = future.result()
+            except ffmpeg.Error as e:
+                st.error(f"Gagal decode audio: {e.stderr.decode(errors='replace') if e.stderr else e}")
+                return
             except Exception as e:
                 st.error(f"Error saat transkripsi: {e}")
                 return
 
-            progress_bar.progress(85, text="Menyusun hasil dan membuat file .srt...")
-            transcript_text = (result.get("text") or "").strip()
-            segments = result.get("segments") or []
-            srt_content = build_srt_from_segments(segments)
-
-            # simpan ke cache
-            st.session_state['results_cache'][file_key] = {
+            # encode sekali aja, bytes-nya dipakai langsung buat download
+            result = {
                 'transcript_text': transcript_text,
                 'srt_content': srt_content,
+                'txt_bytes': transcript_text.encode("utf-8"),
+                'srt_bytes': srt_content.encode("utf-8"),
             }
+            # simpan ke cache (dalam bentuk terkompres)
+            st.session_state['results_cache'].put(file_key, {
+                'txt_bytes': _compress(result['txt_bytes']),
+                'srt_bytes': _compress(result['srt_bytes']),
+            })
 
-            progress_bar.progress(100, text="Selesai!")
+            progress_placeholder.progress(100, text="Selesai!")
 
         else:
             # kalau sudah ada cache -> pakai hasil lama
-            transcript_text = cached['transcript_text']
-            srt_content = cached['srt_content']
+            # (hasil yang lagi ditampilkan disimpan apa adanya, jadi rerun gak dekompres/decode ulang)
+            active = st.session_state.get('active_result')
+            if active is not None and active[0] == file_key:
+                result = active[1]
+            else:
+                txt_bytes = _decompress(cached['txt_bytes'])
+                srt_bytes = _decompress(cached['srt_bytes'])
+                result = {
+                    'transcript_text': txt_bytes.decode("utf-8"),
+                    'srt_content': srt_bytes.decode("utf-8"),
+                    'txt_bytes': txt_bytes,
+                    'srt_bytes': srt_bytes,
+                }
             progress_placeholder.info("Menggunakan hasil yang sudah diproses.")
 
+        st.session_state['active_result'] = (file_key, result)
+        transcript_text = result['transcript_text']
+        srt_content = result['srt_content']
+
         results_container.subheader("Hasil Transkripsi")
         if transcript_text:
             results_container.text_area("Teks Transkripsi", value=transcript_text, height=260)
         else:
             results_container.warning("Tidak ada teks yang dihasilkan dari transkripsi.")
 
-        srt_filename = os.path.splitext(uploaded_file.name)[0] + ".srt"
+        base_name = os.path.splitext(uploaded_file.name)[0]
         results_container.download_button(
             label="Download Subtitle (.srt)",
-            data=srt_content.encode("utf-8"),
-            file_name=srt_filename,
+            data=result['srt_bytes'],
+            file_name=base_name + ".srt",
             mime="application/x-subrip",
             use_container_width=True,
         )
+        results_container.download_button(
+            label="Download Transkrip (.txt)",
+            data=result['txt_bytes'],
+            file_name=base_name + ".txt",
+            mime="text/plain",
+            use_container_width=True,
+        )
 
+        # st.code nge-highlight ulang seluruh teks tiap rerun; defaultnya cukup tampilkan 5 kB pertama sebagai teks biasa
         with results_container.expander("Lihat isi file .srt"):
-            st.code(srt_content, language="text")
-
-        try:
-            os.unlink(temp_upload_path)
-        except Exception:
-            pass
+            if len(srt_content) <= SRT_PREVIEW_CHARS or st.checkbox("Tampilkan .srt lengkap"):
+                st.text(srt_content)
+            else:
+                st.text(srt_content[:SRT_PREVIEW_CHARS] + "…")
 
     else:
+        # upload dihapus -> hentikan job session ini, file sementaranya ikut dibersihkan
+        jobs = st.session_state.get('jobs')
+        if jobs:
+            for job in jobs.values():
+                _cancel_job(job)
+            jobs.clear()
         st.info("Silakan upload file audio/video dulu.")
 
 if __name__ == "__main__":